@@ -13,6 +13,20 @@ Multi-agent deep reinforcement learning model trained on 2-player Regicide using
 # TODO 
 # q val format: dict, obs's are keys, each corresponding value is an array of q-vals indexed by actions
 
+# Frozen policy format: one record per state, sorted by key for binary search
+OBS_LENGTH = 24 # length of play.vectorize_obs vectors
+POLICY_DTYPE = np.dtype([("key", f"S{OBS_LENGTH}"), ("action", "<u2")])
+
+def pack_obs(obs_vector):
+    # every observation entry is a small non-negative integer, so one byte each
+    return np.asarray(obs_vector, dtype=np.uint8).tobytes()
+
+def ID_to_action(action_ID):
+    binary_str = bin(action_ID)[2:]  # Convert decimal ID to binary string without '0b' prefix
+    padded_binary_str = binary_str.zfill(14)
+    action = [int(bit) for bit in padded_binary_str]
+    return action
+
 class RegicideAgent:
     def __init__(
         self,
@@ -41,30 +55,33 @@ class RegicideAgent:
         return action_ID
 
     def ID_to_action(self, action_ID):
-        binary_str = bin(action_ID)[2:]  # Convert decimal ID to binary string without '0b' prefix
-        padded_binary_str = binary_str.zfill(14)
-        action = [int(bit) for bit in padded_binary_str]
-        return action
+        return ID_to_action(action_ID)
 
-    def get_legal_moves(self, obs_vector):
+    def get_legal_moves(self, obs_vector, hand_index=None):
         card_vals = obs_vector[16:23]
-        num_cards = np.count_nonzero(card_vals)
+        nums = [2,3,4,5]
         """ for player attack turn """
         # ID special cards %%%%%%%%%%
-        # ID animal companions
-        animal_companion_idxs = []
-        for i in range(len(card_vals)):
-            if card_vals[i] == 1:
-                animal_companion_idxs.append(i)
-
-        # ID summables
-        two_idxs, three_idxs, four_idxs, five_idxs = [], [], [], []
-        nums = [2,3,4,5]
-        idx_lists = [two_idxs, three_idxs, four_idxs, five_idxs]
-        for num, idx_list in zip(nums, idx_lists):
+        if hand_index is not None: # read from the env's hand index instead of scanning the hand
+            num_cards = hand_index["size"]
+            masks = hand_index["position_masks"]
+            animal_companion_idxs = [i for i in range(num_cards) if masks[1] >> i & 1]
+            idx_lists = [[i for i in range(num_cards) if masks[num] >> i & 1] for num in nums]
+        else:
+            num_cards = np.count_nonzero(card_vals)
+            # ID animal companions
+            animal_companion_idxs = []
             for i in range(len(card_vals)):
-                if card_vals[i] == num:
-                    idx_list.append(i)
+                if card_vals[i] == 1:
+                    animal_companion_idxs.append(i)
+
+            # ID summables
+            two_idxs, three_idxs, four_idxs, five_idxs = [], [], [], []
+            idx_lists = [two_idxs, three_idxs, four_idxs, five_idxs]
+            for num, idx_list in zip(nums, idx_lists):
+                for i in range(len(card_vals)):
+                    if card_vals[i] == num:
+                        idx_list.append(i)
 
         # Collect legal moves for attack turn %%%%%%%%%%
         legal_attacks = []
@@ -146,12 +163,13 @@ class RegicideAgent:
 
         return uniques
                     
-    def get_action(self, observation):
+    def get_action(self, observation, hand_index=None):
         """
         Returns the best action with probability (1 - epsilon)
         otherwise a random action with probability epsilon to ensure exploration.
+        hand_index is the env's "hand_index" observation entry, if available.
         """
-        legal_moves = self.get_legal_moves(observation)
+        legal_moves = self.get_legal_moves(observation, hand_index)
 
         # no remaining moves: game over
         if len(legal_moves) == 0:
@@ -189,3 +207,89 @@ class RegicideAgent:
 
     def decay_epsilon(self, epsilon_decay):
         self.epsilon = max(self.final_epsilon, self.epsilon - epsilon_decay)
+
+    def export_policy(self, path):
+        """
+        Freezes the greedy policy into a sorted array of (packed state, greedy action ID)
+        records saved with np.save, to be loaded read-only by FrozenPolicy.
+        Rows get_action has acted from already hold -999 for illegal moves, so their argmax is the greedy legal
+        action, with ties broken as in get_action. States never acted from are left out and get the heuristic.
+        """
+        records = []
+        for observation, q_row in self.q_values.items():
+            # keys must fit the fixed-width byte format exactly, or lookups would silently go wrong
+            assert len(observation) == OBS_LENGTH, f"expected {OBS_LENGTH} observation entries, got {len(observation)}"
+            assert all(0 <= v < 256 for v in observation), f"observation entries must fit in one byte: {observation}"
+            if not np.any(q_row): # never acted from
+                continue
+            records.append((pack_obs(observation), int(np.argmax(q_row))))
+
+        policy = np.array(records, dtype=POLICY_DTYPE)
+        policy.sort(order="key")
+        np.save(path, policy)
+
+
+class FrozenPolicy:
+    """
+    Read-only greedy policy exported by RegicideAgent.export_policy.
+    The file is memory-mapped, so several processes can share one copy.
+    Unseen states fall back to a simple heuristic.
+    """
+    def __init__(self, path):
+        self.policy = np.load(path, mmap_mode="r")
+        self.keys = self.policy["key"]
+        self.actions = self.policy["action"]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, observation):
+        # returns the stored action ID, or None for unseen states
+        key = pack_obs(observation)
+        idx = int(np.searchsorted(self.keys, key))
+        if idx < len(self.keys) and self.keys[idx] == key.rstrip(b"\x00"): # numpy strips trailing null bytes
+            return int(self.actions[idx])
+        return None
+
+    def heuristic_action(self, observation):
+        """
+        Attacks with the highest card and sacrifices the fewest remaining cards covering the damage,
+        or yields if attacking would leave too little to sacrifice.
+        """
+        # hand size from the suits, since a card's value can be 0 (royal whose attack was reduced by spades)
+        num_cards = 0
+        while num_cards < 7 and observation[9 + num_cards]:
+            num_cards += 1
+        if num_cards == 0:
+            return None
+        card_vals = [int(v) for v in observation[16:16+num_cards]]
+        damage = observation[6]
+
+        best = max(range(len(card_vals)), key=lambda i: card_vals[i])
+        for play in (best, None):
+            attack = [0] * 7
+            remaining = card_vals
+            if play is not None:
+                attack[play] = 1
+                remaining = card_vals[:play] + card_vals[play+1:]
+
+            sacrifice = [0] * 7
+            health = 0
+            for i in sorted(range(len(remaining)), key=lambda i: remaining[i], reverse=True):
+                if health >= damage:
+                    break
+                sacrifice[i] = 1
+                health += remaining[i]
+
+            if health >= damage:
+                return (attack, sacrifice)
+
+        # no choice can cover the damage: game over
+        return None
+
+    def get_action(self, observation):
+        action_ID = self.lookup(observation)
+        if action_ID is None:
+            return self.heuristic_action(observation)
+        action = ID_to_action(action_ID)
+        return (action[:7], action[7:])
@@ -2,6 +2,7 @@ import gymnasium as gym
 from gymnasium.spaces import MultiBinary, Tuple, Dict, Discrete, MultiDiscrete
 import numpy as np
 import random
+import copy
 
 """
 REGICIDE ENV
@@ -17,6 +18,14 @@ Enemies left:           number of enemies left, list of current suits left,
 Current enemy stats:    enemy suit, enemy health, enemy attack,
 Cards to draw:          number of cards in discard pile, number of cards in tavern deck,
 Cards in hand:          list of cards in hand
+Hand index:             summary of the current hand, kept up to date as cards move (see HandIndex)
+
+* Scenarios
+reset(options={"scenario": ...}) starts from a mid-game position instead of a fresh deal: a level, the suits
+already defeated in it, the current enemy, hand sizes and discard pile size (see sample_scenario),
+or an exact position recorded with snapshot().
+Observations report the live enemies left and current enemy health and attack, so a position reached
+in a full game and the same position started as a scenario give the same observation.
 
 * Rewards
 Defeat jack     + 1
@@ -58,6 +67,48 @@ class AnimalCompanion(Card):
         super().__init__(suit, 1)
         self.name = f"animal companion (A) of {self.suit}"
 
+class HandIndex:
+    """
+    Summary of one hand, updated card by card instead of rescanning the hand:
+    size, value histogram, total health and, for values up to 5 (the ones that can form combos,
+    animal companions are value 1), a bitmask of the hand positions holding that value.
+    """
+    max_combo_value = 5
+
+    def __init__(self, cards=()):
+        self.size = 0
+        self.value_counts = [0] * 21
+        self.position_masks = [0] * (self.max_combo_value + 1)
+        self.total_health = 0
+        for card in cards:
+            self.add(card)
+
+    def add(self, card):
+        # cards are always added to the end of the hand
+        self.value_counts[card.attack] += 1
+        if card.attack <= self.max_combo_value:
+            self.position_masks[card.attack] |= 1 << self.size
+        self.total_health += card.health
+        self.size += 1
+
+    def remove(self, card, position):
+        self.value_counts[card.attack] -= 1
+        # drop the card's bit and shift the positions after it down by one
+        below = (1 << position) - 1
+        for value, mask in enumerate(self.position_masks):
+            if mask >> position:
+                self.position_masks[value] = (mask & below) | (mask >> 1 & ~below)
+        self.total_health -= card.health
+        self.size -= 1
+
+    def to_dict(self):
+        return {
+            "size":             self.size,
+            "value_counts":     tuple(self.value_counts),
+            "position_masks":   tuple(self.position_masks),
+            "total_health":     self.total_health,
+        }
+
 class RegicideEnv(gym.Env):
     def __init__(self, verbose=True):
         super().__init__()
@@ -67,12 +118,12 @@ class RegicideEnv(gym.Env):
         self.observation_space = Dict(
             {
                 # Enemies left
-                "enemies_left":     Discrete(12),
+                "enemies_left":     Discrete(13),
                 "curr_suits_left":  MultiDiscrete([5] * 3),
 
                 # Current enemy stats
                 "enemy_suit":       Discrete(4),
-                "enemy_health":     Discrete(21),
+                "enemy_health":     Discrete(41),
                 "enemy_attack":     Discrete(41),
 
                 # Cards to draw
@@ -110,10 +161,10 @@ class RegicideEnv(gym.Env):
                     diamond_value = attack
                     while diamond_value and ((len(self.player_cards) + len(self.ally_cards)) < 14) and self.tavern_cards: # Each player draws until the card value is met, all hands are full, or tavern is empty
                         if len(self.player_cards) < 7:
-                            self.player_cards.append(self.tavern_cards.pop())
+                            self.draw_card(self.tavern_cards.pop())
                             diamond_value -= 1
                         if len(self.ally_cards) < 7:
-                            self.ally_cards.append(self.tavern_cards.pop())
+                            self.draw_card(self.tavern_cards.pop(), ally=True)
                             diamond_value -= 1
                     print(f"Player:\t{old_P_len}/7 —> {len(self.player_cards)}/7") if self.verbose else None
                     print(f"Ally:\t{old_A_len}/7 —> {len(self.ally_cards)}/7") if self.verbose else None
@@ -166,7 +217,7 @@ class RegicideEnv(gym.Env):
             suits.add(card.suit)
             attack += card.attack
             # Move card to discard pile
-            self.player_cards.remove(card)
+            self.remove_card(card)
             self.played_cards.append(card)
         
         # Suit(s) effect
@@ -211,11 +262,44 @@ class RegicideEnv(gym.Env):
             return False
 
         for card in sacrificed_cards:
-            self.player_cards.remove(card)
+            self.remove_card(card)
             self.discard_cards.append(card)
     
         return True
 
+    def get_obs(self):
+        return {
+            # Enemies left
+            "enemies_left":     sum(len(level) for level in self.enemies) + (self.curr_enemy.health > 0),
+            "curr_suits_left":  [self.suit_map[s] for s in self.curr_suits_left],
+
+            # Current enemy stats
+            "enemy_suit":       self.suit_map[self.curr_enemy.suit],
+            "enemy_health":     max(0, self.curr_enemy.health),
+            "enemy_attack":     self.curr_enemy.attack,
+
+            # Cards to draw
+            "num_discard":      self.num_discard,
+            "num_tavern":       self.num_tavern,
+
+            # Cards in hand
+            "player_card_suits":    [self.suit_map[c.suit] for c in self.player_cards],
+            "player_card_values":   [c.attack for c in self.player_cards],
+            "num_ally_cards":       len(self.ally_cards),
+            "hand_index":           self.player_index.to_dict(),
+        }
+
+    def draw_card(self, card, ally=False):
+        hand, index = (self.ally_cards, self.ally_index) if ally else (self.player_cards, self.player_index)
+        hand.append(card)
+        index.add(card)
+
+    def remove_card(self, card):
+        # Removes a card from the current player's hand
+        position = self.player_cards.index(card)
+        del self.player_cards[position]
+        self.player_index.remove(card, position)
+
     def swap_turn(self):
         self.turn = 1 if self.turn == 2 else 2
 
@@ -223,10 +307,137 @@ class RegicideEnv(gym.Env):
         temp_cards = self.player_cards
         self.player_cards = self.ally_cards
         self.ally_cards = temp_cards
+        self.player_index, self.ally_index = self.ally_index, self.player_index
+
+    # Scenario functions ___________________________________________
+    def sample_scenario(self, min_level=0, max_level=2):
+        """
+        Samples a mid-game position that is consistent with the rules:
+        a level, the royals already defeated in it, the current enemy, both hand sizes and the discard pile size.
+        """
+        level = random.randint(min_level, max_level)
+        suits = ["hearts", "diamonds", "clubs", "spades"]
+        random.shuffle(suits)
+        num_defeated = random.randint(0, 3)
+
+        return {
+            "level":            level,
+            "defeated_suits":   suits[:num_defeated],
+            "enemy_suit":       suits[num_defeated],
+            "num_player_cards": random.randint(1, 7),
+            "num_ally_cards":   random.randint(1, 7),
+            "num_discard":      random.randint(0, 4 * level + num_defeated + 10),
+        }
+
+    def snapshot(self):
+        # Current position as a scenario, restored exactly by reset(options={"scenario": ...})
+        defeated_suits = [s for s in ["hearts", "diamonds", "clubs", "spades"]
+                          if s not in self.curr_suits_left and s != self.curr_enemy.suit]
+        return copy.deepcopy({
+            "level":            self.curr_level,
+            "defeated_suits":   defeated_suits,
+            "enemy_suit":       self.curr_enemy.suit,
+            "enemy_health":     self.curr_enemy.health,
+            "enemy_attack":     self.curr_enemy.attack,
+            "player_cards":     self.player_cards,
+            "ally_cards":       self.ally_cards,
+            "played_cards":     self.played_cards,
+            "discard_cards":    self.discard_cards,
+            "tavern_cards":     self.tavern_cards,
+        })
+
+    def load_scenario(self, scenario):
+        suits = ["hearts", "diamonds", "clubs", "spades"]
+        level = scenario["level"]
+        defeated_suits = scenario.get("defeated_suits", [])
+        enemy_suit = scenario.get("enemy_suit")
+
+        # Check the position before building anything
+        if level not in (0, 1, 2):
+            raise ValueError(f"Scenario level must be 0 (jacks), 1 (queens) or 2 (kings), got {level!r}.")
+        unknown = [s for s in defeated_suits if s not in suits]
+        if unknown:
+            raise ValueError(f"Unknown suits in defeated_suits: {unknown}.")
+        if len(set(defeated_suits)) != len(defeated_suits):
+            raise ValueError(f"defeated_suits lists a suit more than once: {defeated_suits}.")
+        if len(defeated_suits) > 3:
+            raise ValueError("At most 3 suits can be defeated, since one enemy of the level must remain.")
+        if enemy_suit is not None and enemy_suit not in suits:
+            raise ValueError(f"Unknown enemy_suit {enemy_suit!r}.")
+        if enemy_suit in defeated_suits:
+            raise ValueError(f"enemy_suit {enemy_suit!r} is already in defeated_suits.")
+        if "player_cards" not in scenario:
+            for key in ("num_player_cards", "num_ally_cards"):
+                if not 1 <= scenario.get(key, 7) <= 7:
+                    raise ValueError(f"{key} must be between 1 and 7, got {scenario[key]!r}.")
+            if scenario.get("num_discard", 0) < 0:
+                raise ValueError(f"num_discard cannot be negative, got {scenario['num_discard']!r}.")
+
+        if enemy_suit is None:
+            enemy_suit = random.choice([s for s in suits if s not in defeated_suits])
+
+        self.turn = 1
+        self.curr_level = level
+
+        # Enemies stay aligned with curr_suits_left, as in reset
+        self.enemies = [[EnemyCard(s, 11 + l) for s in suits] if l >= level else [] for l in range(3)]
+        self.curr_suits_left = [s for s in suits if s not in defeated_suits]
+        self.enemies[level] = [e for e in self.enemies[level] if e.suit in self.curr_suits_left]
+        enemy_idx = self.curr_suits_left.index(enemy_suit)
+        self.curr_suits_left.pop(enemy_idx)
+        self.curr_enemy = self.enemies[level].pop(enemy_idx)
+        self.curr_enemy.health = scenario.get("enemy_health", self.curr_enemy.health)
+        self.curr_enemy.attack = scenario.get("enemy_attack", self.curr_enemy.attack)
+
+        if "player_cards" in scenario: # exact position, e.g. from snapshot()
+            scenario = copy.deepcopy(scenario)
+            self.player_cards  = scenario["player_cards"]
+            self.ally_cards    = scenario["ally_cards"]
+            self.played_cards  = scenario.get("played_cards", [])
+            self.discard_cards = scenario.get("discard_cards", [])
+            self.tavern_cards  = scenario.get("tavern_cards", [])
+        else:
+            # Deal from the number cards plus the royals defeated so far
+            deck = []
+            for suit in suits:
+                deck.append(AnimalCompanion(suit))
+                for number in np.arange(2,11):
+                    deck.append(Card(suit, number))
+                for l in range(level):
+                    deck.append(Card(suit, 11 + l))
+            for suit in defeated_suits:
+                deck.append(Card(suit, 11 + level))
+            random.shuffle(deck)
+
+            num_player = scenario.get("num_player_cards", 7)
+            num_ally   = scenario.get("num_ally_cards", 7)
+            self.player_cards = deck[:num_player]
+            self.ally_cards   = deck[num_player:num_player+num_ally]
+            rest = deck[num_player+num_ally:]
+            num_discard = min(scenario.get("num_discard", 0), len(rest))
+            self.played_cards  = []
+            self.discard_cards = rest[:num_discard]
+            self.tavern_cards  = rest[num_discard:]
+
+        self.player_index = HandIndex(self.player_cards)
+        self.ally_index   = HandIndex(self.ally_cards)
+
+        # Same bookkeeping values as reset; observations read the live enemy instead
+        self.enemies_left = 12
+        self.enemy_attack = 15
+        self.enemy_health = 20
+        self.num_discard  = 0
+        self.num_tavern   = 26
+
+        self.obs = self.get_obs()
+        return self.obs
 
     # Gym functions ___________________________________________
-    def reset(self):
-        super().reset()
+    def reset(self, *, seed=None, options=None):
+        super().reset(seed=seed, options=options)
+
+        if options and options.get("scenario") is not None:
+            return self.load_scenario(options["scenario"])
 
         self.turn = 1 # 1 for player 1, 2 for player 2
 
@@ -261,29 +472,14 @@ class RegicideEnv(gym.Env):
         self.num_tavern      = 26 # 52 - 12 enemies - 7*2 cards in both player hands
         self.player_cards    = in_play[:max_hand]
         self.ally_cards      = in_play[max_hand:2*max_hand]
+        self.player_index    = HandIndex(self.player_cards)
+        self.ally_index      = HandIndex(self.ally_cards)
         self.played_cards    = []
         self.discard_cards   = []
         self.tavern_cards    = self.cards
 
-        self.obs = {
-            # Enemies left
-            "enemies_left":     12,
-            "curr_suits_left":  [self.suit_map[s] for s in self.curr_suits_left],
-
-            # Current enemy stats
-            "enemy_suit":       random_suit,
-            "enemy_health":     self.enemy_health,
-            "enemy_attack":     self.enemy_attack,
-
-            # Cards to draw
-            "num_discard":      self.num_discard,
-            "num_tavern":       self.num_tavern,
-
-            # Cards in hand
-            "player_card_suits":    [self.suit_map[c.suit] for c in self.player_cards],
-            "player_card_values":   [c.attack for c in self.player_cards],
-            "num_ally_cards":       len(self.ally_cards)
-            }
+        self.obs = self.get_obs()
+        self.obs["enemy_suit"] = random_suit # the first enemy is reported by its 0-based suit index
 
         return self.obs
  
@@ -326,16 +522,17 @@ class RegicideEnv(gym.Env):
             self.played_cards = []
 
             # Pull new enemy card      
-            random_suit = random.randint(0, len(self.curr_suits_left)-1) 
-            self.curr_suits_left.pop(random_suit)
-            self.curr_enemy = self.enemies[self.curr_level][random_suit]
-            del self.enemies[self.curr_level][random_suit]
+            if not game_over:
+                random_suit = random.randint(0, len(self.curr_suits_left)-1) 
+                self.curr_suits_left.pop(random_suit)
+                self.curr_enemy = self.enemies[self.curr_level][random_suit]
+                del self.enemies[self.curr_level][random_suit]
 
         else: # enemy attack turn
             self.render(turn="enemy") # see current enemy stats and cards in hand
 
             # no choice can win. game over!
-            total_health = sum(card.health for card in self.player_cards)
+            total_health = self.player_index.total_health
             if total_health < self.curr_enemy.attack:
                 print(f"The {self.curr_enemy.name} slaughtered your remaining champions... Surrounded, your ally's champions fell soon after.\n") if self.verbose else None
                 print(f"Innocents perished as corruption overtook the kingdom.\n") if self.verbose else None
@@ -364,25 +561,7 @@ class RegicideEnv(gym.Env):
 
         self.swap_turn()
 
-        self.obs = {
-            # Enemies left
-            "enemies_left":     self.enemies_left,
-            "curr_suits_left":  [self.suit_map[s] for s in self.curr_suits_left],
-
-            # Current enemy stats
-            "enemy_suit":       self.suit_map[self.curr_enemy.suit],
-            "enemy_health":     self.enemy_health,
-            "enemy_attack":     self.enemy_attack,
-
-            # Cards to draw
-            "num_discard":      self.num_discard,
-            "num_tavern":       self.num_tavern,
-
-            # Cards in hand
-            "player_card_suits":    [self.suit_map[c.suit] for c in self.player_cards],
-            "player_card_values":   [c.attack for c in self.player_cards],
-            "num_ally_cards":       len(self.ally_cards),
-        }
+        self.obs = self.get_obs()
 
         return self.obs, game_over, reward
 
@@ -3,6 +3,8 @@ from agent import RegicideAgent
 import numpy as np
 from tqdm import tqdm
 import matplotlib.pyplot as plt
+import random
+from collections import deque
 
 # helper functions
 def vectorize_obs(observation):
@@ -19,6 +21,75 @@ def vectorize_obs(observation):
     obs_vector[23 ]   = observation["num_ally_cards"]
     return tuple(obs_vector)
 
+class Curriculum:
+    """
+    Start-state curriculum: episodes start at the kings, then the queens, then the jacks, then only from fresh deals.
+    The start level moves on once the recent rate of clearing the starting level reaches the target,
+    or after stage_episodes episodes at the latest. A share of episodes always starts from a fresh deal.
+    The first position of every queen/king level reached in play is recorded and replayed as a start state.
+    """
+    def __init__(self, env, stage_episodes, target_clear_rate=0.3, window=200, fresh_prob=0.25, replay_prob=0.5, buffer_size=1000):
+        self.env = env
+        self.level = 2 # lowest start level of the current stage, -1 for fresh deals only
+        self.stage_episodes = stage_episodes
+        self.stage_count = 0
+        self.target_clear_rate = target_clear_rate
+        self.fresh_prob = fresh_prob
+        self.replay_prob = replay_prob
+        self.results = deque(maxlen=window)
+        self.recorded = deque(maxlen=buffer_size)
+        self.start_level = None # level the current episode started at, None for fresh deals
+        self.last_level = 0
+
+    def start_state(self):
+        if self.level < 0 or random.random() < self.fresh_prob:
+            observation = self.env.reset()
+            self.start_level = None
+        else:
+            recorded = [s for s in self.recorded if s["level"] >= self.level]
+            if recorded and random.random() < self.replay_prob:
+                scenario = random.choice(recorded)
+            else:
+                scenario = self.env.sample_scenario(min_level=self.level)
+            observation = self.env.reset(options={"scenario": scenario})
+            self.start_level = self.env.curr_level
+        self.last_level = self.env.curr_level
+        return observation
+
+    def record(self, game_over):
+        if not game_over and self.last_level < self.env.curr_level < 3:
+            self.recorded.append(self.env.snapshot())
+        self.last_level = self.env.curr_level
+
+    def update(self):
+        # progress on scenario starts is clearing the level the episode started at
+        self.stage_count += 1
+        if self.start_level is not None:
+            self.results.append(self.env.curr_level > self.start_level)
+
+        target_reached = len(self.results) == self.results.maxlen and np.mean(self.results) >= self.target_clear_rate
+        if self.level >= 0 and (target_reached or self.stage_count >= self.stage_episodes):
+            self.level -= 1
+            self.stage_count = 0
+            self.results.clear()
+
+def evaluate(agent, n_games):
+    # greedy win rate on fresh deals, without learning
+    eval_env = RegicideEnv(verbose=False)
+    epsilon, agent.epsilon = agent.epsilon, 0
+    wins = 0
+    for _ in range(n_games):
+        raw_observation = eval_env.reset()
+        game_over = False
+        while not game_over:
+            action = agent.get_action(vectorize_obs(raw_observation), raw_observation["hand_index"])
+            if not action:
+                break
+            raw_observation, game_over, reward = eval_env.step(eval_env.do_action(action))
+        wins += (eval_env.curr_level == 3)
+    agent.epsilon = epsilon
+    return wins / n_games
+
 # hyperparameters
 learning_rate = 0.001
 n_episodes = 10000
@@ -27,61 +98,96 @@ epsilon_decay = start_epsilon / n_episodes / 10  # reduce the exploration over t
 print("epsilon decay =", epsilon_decay)
 final_epsilon = 0.1
 
-# create agent
-agent = RegicideAgent(
-    learning_rate=learning_rate,
-    initial_epsilon=start_epsilon,
-    epsilon_decay=epsilon_decay,
-    final_epsilon=final_epsilon,
-)
-
-# Create env
-verbose = (n_episodes < 10)
-env = RegicideEnv(verbose=verbose)
-total_turns = 0 # running average of turn_count
-total_eps = 0
-turns_history = []
-
-# Play and learn
-for episode in tqdm(range(n_episodes)):
-    observation = vectorize_obs(env.reset())
-    game_over, turn_count, reward = False, 0, 0
-    total_eps += 1
-
-    while not game_over:
-        turn_count += 1
-        total_turns += 1
-        
-        # if verbose:
-        #     print("turn:", turn_count)
-        #     env.render()
-
-        action = agent.get_action(observation)
-
-        if not action: # no legal actions found
-            game_over = True
-            reward = -1
+use_curriculum = False      # start episodes from mid-game scenarios (see Curriculum)
+compare_curriculum = False  # also train the other way and report both
+eval_every = 500            # episodes between evaluations on fresh deals
+eval_games = 100
+target_win_rate = 0.05      # fresh-deal win rate to reach
+
+def train(use_curriculum):
+    # create agent
+    agent = RegicideAgent(
+        learning_rate=learning_rate,
+        initial_epsilon=start_epsilon,
+        epsilon_decay=epsilon_decay,
+        final_epsilon=final_epsilon,
+    )
+
+    # Create env
+    verbose = (n_episodes < 10)
+    env = RegicideEnv(verbose=verbose)
+    total_turns = 0 # running average of turn_count
+    total_eps = 0
+    turns_history = []
+    curriculum = Curriculum(env, stage_episodes=n_episodes // 4) if use_curriculum else None
+    steps_to_target = None # simulated steps until the fresh-deal win rate first reached the target
+
+    # Play and learn
+    for episode in tqdm(range(n_episodes)):
+        raw_observation = curriculum.start_state() if curriculum else env.reset()
+        observation = vectorize_obs(raw_observation)
+        game_over, turn_count, reward = False, 0, 0
+        total_eps += 1
+
+        while not game_over:
+            turn_count += 1
+            total_turns += 1
+            
             # if verbose:
-            #     print("No remaining legal actions. GAME OVER.")
-            break
+            #     print("turn:", turn_count)
+            #     env.render()
+
+            action = agent.get_action(observation, raw_observation["hand_index"])
+
+            if not action: # no legal actions found
+                game_over = True
+                reward = -1
+                # if verbose:
+                #     print("No remaining legal actions. GAME OVER.")
+                break
+
+            raw_observation, game_over, reward = env.step(env.do_action(action))
+            if curriculum:
+                curriculum.record(game_over)
+
+            action, next_observation = agent.ID_action(action), vectorize_obs(raw_observation)
+            agent.update(action, observation, game_over, reward, next_observation)
+            
+            observation = next_observation
 
-        next_observation, game_over, reward = env.step(env.do_action(action))
+        if curriculum:
+            curriculum.update()
 
-        action, next_observation = agent.ID_action(action), vectorize_obs(next_observation)
-        agent.update(action, observation, game_over, reward, next_observation)
-        
-        observation = next_observation
+        avg_turns = total_turns / total_eps
+        turns_history.append(turn_count)
+        # print(f"\nepisode {episode}  —  turn count: {turn_count}\t(avg: {str(avg_turns)[:6]})")
+        agent.decay_epsilon(epsilon_decay)
 
-    avg_turns = total_turns / total_eps
-    turns_history.append(turn_count)
-    # print(f"\nepisode {episode}  —  turn count: {turn_count}\t(avg: {str(avg_turns)[:6]})")
-    agent.decay_epsilon(epsilon_decay)
+        if (episode + 1) % eval_every == 0:
+            win_rate = evaluate(agent, eval_games)
+            print(f"\nepisode {episode + 1}: fresh-deal win rate {win_rate:.2%} after {total_turns} simulated steps")
+            if steps_to_target is None and win_rate >= target_win_rate:
+                steps_to_target = total_turns
 
+    return agent, turns_history, avg_turns, steps_to_target
+
+def describe(steps_to_target):
+    return f"{steps_to_target} simulated steps" if steps_to_target is not None else "not reached"
+
+agent, turns_history, avg_turns, steps_to_target = train(use_curriculum)
 
 print(f"final turn count: {turns_history[-1]}, avg turn count: {avg_turns}")
+print(f"target win rate {target_win_rate:.0%} ({'with' if use_curriculum else 'without'} curriculum): {describe(steps_to_target)}")
+if compare_curriculum:
+    other_steps_to_target = train(not use_curriculum)[3]
+    print(f"target win rate {target_win_rate:.0%} ({'without' if use_curriculum else 'with'} curriculum): {describe(other_steps_to_target)}")
+
 plt.plot(range(n_episodes), turns_history, c="indigo", lw=0.2)
 plt.axhline(avg_turns, c="black", zorder=3, ls="--")
 plt.xlabel("Episodes")
 plt.ylabel("Game length (turns)")
 plt.title("Game duration over episodes played")
-plt.savefig("history")
\ No newline at end of file
+plt.savefig("history")
+
+# freeze the learned greedy policy for inference (see FrozenPolicy)
+agent.export_policy("policy.npy")
\ No newline at end of file